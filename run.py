@@ -4,6 +4,7 @@ Simple runner script for the painting pipeline.
 Usage: python run.py input/your_photo.jpg
 """
 
+import logging
 import sys
 import os
 
@@ -13,6 +14,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from dotenv import load_dotenv
 load_dotenv(override=True)  # Override shell env vars with .env values
 
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
 from src.pipeline import PaintingPipeline
 
 
@@ -6,6 +6,9 @@ from .gemini_client import GeminiImageClient
 from .prompts import PROMPTS, NUM_VERSIONS, get_prompt
 from .critique import ImageCritic
 from .pipeline import PaintingPipeline
+from .batch import build_batch_file, parse_batch_results
+from .response_cache import ResponseCache
+from .dispatcher import PromptDispatcher
 
 __all__ = [
     "GeminiImageClient",
@@ -14,4 +17,8 @@ __all__ = [
     "get_prompt",
     "ImageCritic",
     "PaintingPipeline",
+    "build_batch_file",
+    "parse_batch_results",
+    "ResponseCache",
+    "PromptDispatcher",
 ]
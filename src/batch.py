@@ -0,0 +1,87 @@
+"""
+Batch-request building for offline/overnight runs.
+
+Gemini's Batch API processes queued jobs at half the interactive price and
+schedules them server-side, so large photo sets don't fight the sync RPM
+limit. This module only builds and parses the JSONL files; submitting the
+job (upload file -> create batch -> poll -> download) happens outside the
+pipeline.
+"""
+
+import base64
+from pathlib import Path
+
+import orjson
+
+from .gemini_client import GeminiImageClient
+from .prompts import get_prompt_json_part, NUM_VERSIONS
+
+
+def _encode_image(path: Path) -> tuple[str, str]:
+    """Base64-encode an image file and pick its mime type."""
+    mime_type = GeminiImageClient.MIME_TYPES.get(path.suffix.lower(), "image/jpeg")
+    data = base64.standard_b64encode(path.read_bytes()).decode("ascii")
+    return data, mime_type
+
+
+def build_batch_file(
+    photo_paths: list,
+    output_path: str,
+    versions: range = None,
+    aspect_ratio: str = "4:5",
+    image_size: str = "2K",
+) -> str:
+    """
+    Write a Gemini batch JSONL file covering photos x versions.
+
+    Each line is {"key": "<photo_stem>:v<version>", "request": {...}} with
+    the reference photo inlined and the version prompt from get_prompt.
+    Keys round-trip through parse_batch_results.
+
+    Returns the path written.
+    """
+    versions = versions or range(1, NUM_VERSIONS + 1)
+
+    # The prompt text and generation config are constant across photos -
+    # serialize them once and splice the bytes into each line rather than
+    # re-serializing the same ~2KB of text per photo x version
+    gen_config = orjson.dumps({
+        "responseModalities": ["TEXT", "IMAGE"],
+        "imageConfig": {"aspectRatio": aspect_ratio, "imageSize": image_size},
+    })
+    text_parts = {v: get_prompt_json_part(v) for v in versions}
+
+    with open(output_path, "wb") as f:
+        for photo in photo_paths:
+            photo = Path(photo)
+            img_data, mime_type = _encode_image(photo)
+            img_part = orjson.dumps(
+                {"inline_data": {"mime_type": mime_type, "data": img_data}}
+            )
+            for version in versions:
+                f.write(b"".join([
+                    b'{"key":', orjson.dumps(f"{photo.stem}:v{version}"),
+                    b',"request":{"contents":[{"role":"user","parts":[',
+                    img_part, b",", text_parts[version],
+                    b']}],"generationConfig":', gen_config, b"}}\n",
+                ]))
+
+    return output_path
+
+
+def parse_batch_results(results_path: str) -> dict:
+    """
+    Map a downloaded batch results JSONL back to (photo_id, version).
+
+    Returns {(photo_stem, version): response_dict}; failed entries map to
+    the error object the API returned instead.
+    """
+    results = {}
+    with open(results_path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = orjson.loads(line)
+            photo_id, _, vtag = entry["key"].rpartition(":v")
+            results[(photo_id, int(vtag))] = entry.get("response") or entry.get("error")
+    return results
@@ -3,9 +3,38 @@ Self-critique system for evaluating generated images against
 milestone requirements.
 """
 
+import hashlib
+import re
+import orjson
+from pathlib import Path
 from typing import Optional
 from .gemini_client import GeminiImageClient
-from .prompts import get_critique_prompt
+from .prompts import get_critique_prompt, parse_critique
+
+# Compiled once - runs on every critique
+_SCORE_RE = re.compile(r'overall\s*score[:\s]*(\d+)', re.IGNORECASE)
+
+# Schema enforced server-side via responseSchema, so the model can't hand
+# back nulls or "6/10" strings where the parser expects numbers
+_CRITIQUE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "scores": {
+            "type": "OBJECT",
+            "properties": {
+                "value": {"type": "INTEGER"},
+                "edges": {"type": "INTEGER"},
+                "atmosphere": {"type": "INTEGER"},
+                "painterly": {"type": "INTEGER"},
+            },
+        },
+        "progression_fit": {"type": "INTEGER"},
+        "overall": {"type": "INTEGER"},
+        "issues": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "verdict": {"type": "STRING", "enum": ["PASS", "FAIL"]},
+    },
+    "required": ["overall", "issues", "verdict"],
+}
 
 
 class ImageCritic:
@@ -13,6 +42,52 @@ class ImageCritic:
 
     def __init__(self, client: GeminiImageClient):
         self.client = client
+        # Parsed critiques keyed by (image content hash, version, has_previous) -
+        # identical images don't pay a second network call + parse
+        self._critique_cache: dict[tuple[str, int, bool], dict] = {}
+
+    @staticmethod
+    def _parse_json_critique(analysis: str):
+        """
+        Load and validate a JSON critique, tolerating markdown code fences.
+
+        Returns {"passed", "overall_score", "issues"} with coerced types,
+        or None whenever the JSON or any field inside it is unusable
+        (null overall, "6/10" strings, non-list issues, ...) so the text
+        fallbacks run instead of a TypeError killing the run.
+        """
+        text = analysis.strip()
+        if text.startswith("```"):
+            text = text.strip("`")
+            if text.startswith("json"):
+                text = text[4:]
+        try:
+            data = orjson.loads(text)
+        except orjson.JSONDecodeError:
+            return None
+        if not isinstance(data, dict):
+            return None
+
+        verdict = data.get("verdict")
+        if not isinstance(verdict, str):
+            return None
+
+        try:
+            overall_score = int(data.get("overall"))
+        except (TypeError, ValueError):
+            return None
+
+        issues = data.get("issues")
+        if issues is None:
+            issues = []
+        if not isinstance(issues, list):
+            return None
+
+        return {
+            "passed": verdict.strip().upper() == "PASS",
+            "overall_score": overall_score,
+            "issues": [str(issue) for issue in issues],
+        }
 
     def critique_image(
         self,
@@ -26,15 +101,31 @@ class ImageCritic:
         Returns:
             dict with keys: success, passed, overall_score, critique, issues, suggestions
         """
+        has_previous = bool(previous_image_path and version > 1)
+        digest = hashlib.blake2b(
+            Path(image_path).read_bytes(), digest_size=16
+        ).hexdigest()
+        cache_key = (digest, version, has_previous)
+        cached = self._critique_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         prompt = get_critique_prompt(version)
 
-        if previous_image_path and version > 1:
+        if has_previous:
             prompt += f"""
 IMPORTANT: This should feel like a natural progression from version {version-1}.
 Does it build coherently on what came before?
 """
 
-        result = self.client.analyze_image(image_path, prompt)
+        # Encode once and hand the client the prebuilt inline data - any
+        # further analysis of this image in the same turn reuses the pair
+        img_b64, mime_type = self.client._image_to_base64(image_path)
+        result = self.client.analyze_image_encoded(
+            img_b64, mime_type, prompt,
+            response_mime_type="application/json",
+            response_schema=_CRITIQUE_SCHEMA,
+        )
 
         if not result["success"]:
             return {
@@ -47,39 +138,77 @@ Does it build coherently on what came before?
                 "error": result["error"],
             }
 
-        # Parse the critique response
+        # The critique prompt asks for strict JSON - a verdict check is
+        # then a dict lookup. Fenced or malformed output falls through to
+        # the text parsers below.
         analysis = result["analysis"]
+        data = self._parse_json_critique(analysis)
+        if data is not None:
+            critique = {
+                "success": True,
+                "passed": data["passed"],
+                "overall_score": data["overall_score"],
+                "critique": analysis,
+                "issues": data["issues"],
+                "suggestions": [],
+                "error": None,
+            }
+            self._critique_cache[cache_key] = critique
+            return critique
+
+        # Older text-format responses parse in one regex pass; anything
+        # that deviates from the template falls through to the heuristics
+        parsed = parse_critique(analysis)
+        if parsed is not None:
+            critique = {
+                "success": True,
+                "passed": parsed["passed"],
+                "overall_score": parsed["overall_score"],
+                "critique": analysis,
+                "issues": parsed["issues"],
+                "suggestions": [],
+                "error": None,
+            }
+            self._critique_cache[cache_key] = critique
+            return critique
 
-        # Simple heuristic parsing - look for PASS/FAIL and scores
-        passed = "PASS" in analysis.upper() and "FAIL" not in analysis.upper().split("PASS")[0]
+        # Fallback: locate the section markers in one uppercased copy,
+        # then slice the original text by index
+        upper = analysis.upper()
+
+        pass_idx = upper.find("PASS")
+        fail_idx = upper.find("FAIL")
+        score_idx = upper.find("OVERALL SCORE")
+        issues_idx = upper.find("CRITICAL ISSUES")
+
+        # PASS present, and no FAIL before it
+        passed = pass_idx != -1 and (fail_idx == -1 or fail_idx > pass_idx)
 
         # Try to extract overall score
         overall_score = 5  # default
-        if "OVERALL SCORE" in analysis.upper():
+        if score_idx != -1:
             try:
-                import re
-                score_match = re.search(r'overall\s*score[:\s]*(\d+)', analysis, re.IGNORECASE)
+                score_match = _SCORE_RE.search(analysis, score_idx)
                 if score_match:
                     overall_score = int(score_match.group(1))
             except:
                 pass
 
-        # Extract critical issues
+        # Extract critical issues - simple linear scan over the bullet
+        # lines, no regex backtracking
         issues = []
-        if "CRITICAL ISSUES" in analysis.upper():
-            try:
-                start = analysis.upper().find("CRITICAL ISSUES")
-                end = analysis.upper().find("VERDICT", start)
-                if end == -1:
-                    end = len(analysis)
-                issues_text = analysis[start:end]
-                import re
-                issue_items = re.findall(r'[-•*]\s*(.+?)(?=[-•*]|\n\n|$)', issues_text, re.DOTALL)
-                issues = [item.strip() for item in issue_items if item.strip()]
-            except:
-                pass
+        if issues_idx != -1:
+            end = upper.find("VERDICT", issues_idx)
+            if end == -1:
+                end = len(analysis)
+            for line in analysis[issues_idx:end].splitlines():
+                stripped = line.lstrip()
+                if stripped and stripped[0] in "-•*":
+                    item = stripped[1:].strip()
+                    if item:
+                        issues.append(item)
 
-        return {
+        critique = {
             "success": True,
             "passed": passed,
             "overall_score": overall_score,
@@ -88,3 +217,5 @@ Does it build coherently on what came before?
             "suggestions": [],
             "error": None,
         }
+        self._critique_cache[cache_key] = critique
+        return critique
@@ -0,0 +1,66 @@
+"""
+Bounded-concurrency dispatch for large photo x version workloads.
+
+Sequential calls make a 5-version x N-photo run take N x 5 round trips;
+unbounded gather trips the provider's rate limiter instead. The
+dispatcher schedules everything concurrently under two caps: max
+requests in flight, and requests per minute.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+
+class RateLimiter:
+    """Sliding-window async rate limiter (max_calls per period seconds)."""
+
+    def __init__(self, max_calls: int, period: float = 60.0):
+        self.max_calls = max_calls
+        self.period = period
+        self._timestamps = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                while self._timestamps and now - self._timestamps[0] >= self.period:
+                    self._timestamps.popleft()
+                if len(self._timestamps) < self.max_calls:
+                    self._timestamps.append(now)
+                    return
+                wait = self.period - (now - self._timestamps[0])
+            await asyncio.sleep(wait)
+
+
+class PromptDispatcher:
+    """
+    Schedules async API calls under RPM and in-flight caps.
+
+    acall is any async callable returning a result dict - typically
+    GeminiImageClient.agenerate_image or aanalyze_image.
+    """
+
+    def __init__(self, acall, rpm: int = 10, max_concurrency: int = 4,
+                 period: float = 60.0):
+        self._acall = acall
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._limiter = RateLimiter(rpm, period)
+
+    async def call(self, **kwargs):
+        async with self._semaphore:
+            await self._limiter.acquire()
+            return await self._acall(**kwargs)
+
+    async def dispatch_all(self, items: list) -> list:
+        """
+        Run every kwargs dict in items concurrently under the caps.
+
+        Results come back in submission order; an entry is the raised
+        exception if that call failed unexpectedly.
+        """
+        return await asyncio.gather(
+            *(self.call(**item) for item in items),
+            return_exceptions=True,
+        )
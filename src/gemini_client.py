@@ -3,9 +3,15 @@ Gemini API client for image generation using gemini-3-pro-image-preview.
 """
 
 import os
+import asyncio
 import base64
-import json
+import hashlib
+import threading
+import uuid
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pathlib import Path
 from typing import Optional
 
@@ -14,6 +20,18 @@ class GeminiImageClient:
     """Client for Gemini 3 Pro Image Preview API."""
 
     API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-3-pro-image-preview:generateContent"
+    FILES_UPLOAD_URL = "https://generativelanguage.googleapis.com/upload/v1beta/files"
+
+    # Original photo + previous and current version references
+    B64_CACHE_MAX = 3
+
+    MIME_TYPES = {
+        ".jpg": "image/jpeg",
+        ".jpeg": "image/jpeg",
+        ".png": "image/png",
+        ".webp": "image/webp",
+        ".gif": "image/gif",
+    }
 
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
@@ -22,25 +40,125 @@ class GeminiImageClient:
         # Clean up any corrupted env values (e.g., "export" appended)
         self.api_key = self.api_key.replace("export", "").strip()
 
+        # One pooled session for all calls - keeps the TLS connection to
+        # generativelanguage.googleapis.com alive instead of paying a fresh
+        # TCP + TLS handshake per generate/analyze call.
+        # Retry transient failures (rate limits, server errors, dropped
+        # connections) with exponential backoff instead of failing the run;
+        # Retry-After headers from the API are honored automatically.
+        retries = Retry(
+            total=5,
+            backoff_factor=1,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["POST"],
+        )
+        self._session = requests.Session()
+        self._session.mount(
+            "https://",
+            HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries),
+        )
+        self._session.headers.update({
+            "x-goog-api-key": self.api_key,
+            "Content-Type": "application/json",
+        })
+
+        # Small LRU of encoded reference images keyed by
+        # (path, mtime_ns, size), so critique/regenerate loops don't
+        # re-read and re-encode the same multi-MB photo on every attempt.
+        # Capped hard: only the original photo plus the previous/current
+        # version references are hot, and an unbounded cache would retain
+        # every attempt's multi-MB base64 string for the client's lifetime
+        # (which is the whole process since clients are shared).
+        self._b64_cache: dict[tuple[str, int, int], tuple[str, str]] = {}
+        self._b64_cache_lock = threading.Lock()
+
+        # Uploaded Files API URIs keyed by content hash, so the same
+        # reference image is uploaded once and reused across versions
+        self._file_uri_cache: dict[str, str] = {}
+
     def _image_to_base64(self, image_path: str) -> tuple[str, str]:
         """Convert image file to base64 and determine mime type."""
         path = Path(image_path)
-        suffix = path.suffix.lower()
-
-        mime_types = {
-            ".jpg": "image/jpeg",
-            ".jpeg": "image/jpeg",
-            ".png": "image/png",
-            ".webp": "image/webp",
-            ".gif": "image/gif",
-        }
-
-        mime_type = mime_types.get(suffix, "image/jpeg")
 
+        st = os.stat(path)
+        cache_key = (str(path), st.st_mtime_ns, st.st_size)
+        with self._b64_cache_lock:
+            cached = self._b64_cache.get(cache_key)
+            if cached is not None:
+                # Re-insert to mark most recently used
+                self._b64_cache[cache_key] = self._b64_cache.pop(cache_key)
+                return cached
+
+        mime_type = self.MIME_TYPES.get(path.suffix.lower(), "image/jpeg")
+
+        # Encode in 48KB chunks (multiple of 3, so no padding mid-stream)
+        # instead of materializing the whole file plus a full base64 copy -
+        # keeps peak memory down for multi-MB reference photos
+        encoded = bytearray()
         with open(path, "rb") as f:
-            data = base64.standard_b64encode(f.read()).decode("utf-8")
+            while chunk := f.read(49152):
+                encoded.extend(base64.standard_b64encode(chunk))
+
+        result = (encoded.decode("ascii"), mime_type)
+        with self._b64_cache_lock:
+            while len(self._b64_cache) >= self.B64_CACHE_MAX:
+                # Evict least recently used (oldest insertion)
+                self._b64_cache.pop(next(iter(self._b64_cache)))
+            self._b64_cache[cache_key] = result
+        return result
+
+    def upload_file(self, image_path: str) -> Optional[str]:
+        """
+        Upload an image to the Gemini Files API and return its file URI.
+
+        Uploading once and referencing by URI avoids the 33% base64
+        inflation of inlining the image into every request body. URIs are
+        cached by content hash so repeated calls with the same image
+        (e.g. across versions) reuse the upload.
+
+        Returns None if the upload fails.
+        """
+        path = Path(image_path)
+        data = path.read_bytes()
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+
+        cached_uri = self._file_uri_cache.get(digest)
+        if cached_uri:
+            return cached_uri
+
+        mime_type = self.MIME_TYPES.get(path.suffix.lower(), "image/jpeg")
+        metadata = orjson.dumps({"file": {"display_name": path.name}}).decode()
+
+        # multipart/related: JSON metadata part followed by the raw bytes
+        boundary = uuid.uuid4().hex
+        body = b"".join([
+            f"--{boundary}\r\nContent-Type: application/json\r\n\r\n{metadata}\r\n".encode(),
+            f"--{boundary}\r\nContent-Type: {mime_type}\r\n\r\n".encode(),
+            data,
+            f"\r\n--{boundary}--\r\n".encode(),
+        ])
 
-        return data, mime_type
+        try:
+            response = self._session.post(
+                self.FILES_UPLOAD_URL,
+                headers={
+                    "X-Goog-Upload-Protocol": "multipart",
+                    "Content-Type": f"multipart/related; boundary={boundary}",
+                },
+                data=body,
+                timeout=120,
+            )
+            if response.status_code != 200:
+                print(f"File upload failed ({response.status_code}): {response.text}")
+                return None
+
+            uri = orjson.loads(response.content).get("file", {}).get("uri")
+            if uri:
+                self._file_uri_cache[digest] = uri
+            return uri
+        except Exception as e:
+            print(f"File upload failed: {e}")
+            return None
 
     def _save_response_image(self, response_data: dict, output_path: str) -> Optional[str]:
         """Extract and save image from API response."""
@@ -55,10 +173,15 @@ class GeminiImageClient:
                 # Handle both camelCase (API response) and snake_case formats
                 inline_data = part.get("inlineData") or part.get("inline_data")
                 if inline_data:
-                    image_data = base64.standard_b64decode(inline_data["data"])
-
+                    # Decode straight to disk in 64KB base64 slices (multiple
+                    # of 4, so each slice decodes cleanly) - avoids holding
+                    # the multi-MB decoded image alongside its base64 string.
+                    # The bytes are written verbatim (the API already encoded
+                    # the PNG) - there is no client-side re-encode to tune.
+                    data_b64 = inline_data["data"]
                     with open(output_path, "wb") as f:
-                        f.write(image_data)
+                        for i in range(0, len(data_b64), 65536):
+                            f.write(base64.standard_b64decode(data_b64[i:i + 65536]))
 
                     return output_path
 
@@ -103,6 +226,9 @@ class GeminiImageClient:
         aspect_ratio: str = "4:5",  # Matches 80x100cm canvas (landscape)
         image_size: str = "2K",
         previous_thought_signature: Optional[str] = None,
+        use_file_api: bool = False,
+        reference_image_b64: Optional[tuple[str, str]] = None,
+        system_instruction: Optional[str] = None,
     ) -> dict:
         """
         Generate an image using Gemini 3 Pro Image Preview.
@@ -110,31 +236,53 @@ class GeminiImageClient:
         Args:
             prompt: Text prompt describing the desired image
             reference_image_path: Optional path to reference image
+            reference_image_b64: Optional pre-encoded (base64, mime_type)
+                pair for the reference - skips the file read + encode, like
+                analyze_image_encoded
+            system_instruction: Optional system-slot text (e.g. the style
+                foundation) sent as systemInstruction instead of inlined
+                into the user prompt
             output_path: Where to save the generated image
             aspect_ratio: Aspect ratio (e.g., "3:4", "1:1", "16:9")
             image_size: Resolution ("1K", "2K", "4K")
             previous_thought_signature: For multi-turn editing continuity
+            use_file_api: Upload the reference via the Files API and pass it
+                by URI instead of inlining base64 (falls back to inline if
+                the upload fails)
 
         Returns:
             dict with keys: success, image_path, text_response, thought_signature, error
         """
-        headers = {
-            "x-goog-api-key": self.api_key,
-            "Content-Type": "application/json",
-        }
-
         # Build parts
         parts = []
 
         # Add reference image if provided
-        if reference_image_path:
-            img_data, mime_type = self._image_to_base64(reference_image_path)
-            parts.append({
-                "inline_data": {
-                    "mime_type": mime_type,
-                    "data": img_data
-                }
-            })
+        if reference_image_path or reference_image_b64:
+            file_uri = (
+                self.upload_file(reference_image_path)
+                if use_file_api and reference_image_path else None
+            )
+            if file_uri:
+                mime_type = self.MIME_TYPES.get(
+                    Path(reference_image_path).suffix.lower(), "image/jpeg"
+                )
+                parts.append({
+                    "file_data": {
+                        "mime_type": mime_type,
+                        "file_uri": file_uri
+                    }
+                })
+            else:
+                if reference_image_b64 is not None:
+                    img_data, mime_type = reference_image_b64
+                else:
+                    img_data, mime_type = self._image_to_base64(reference_image_path)
+                parts.append({
+                    "inline_data": {
+                        "mime_type": mime_type,
+                        "data": img_data
+                    }
+                })
 
         # Add text prompt
         parts.append({"text": prompt})
@@ -154,15 +302,17 @@ class GeminiImageClient:
             }
         }
 
+        if system_instruction:
+            body["systemInstruction"] = {"parts": [{"text": system_instruction}]}
+
         # Add thought signature for multi-turn editing
         if previous_thought_signature:
             body["contents"][0]["thoughtSignature"] = previous_thought_signature
 
         try:
-            response = requests.post(
+            response = self._session.post(
                 self.API_URL,
-                headers=headers,
-                json=body,
+                data=orjson.dumps(body),  # orjson: ~5x faster than stdlib on b64-heavy bodies
                 timeout=120  # Image generation can take a while
             )
 
@@ -175,7 +325,7 @@ class GeminiImageClient:
                     "thought_signature": None,
                 }
 
-            response_data = response.json()
+            response_data = orjson.loads(response.content)
 
             # Save image
             saved_path = self._save_response_image(response_data, output_path)
@@ -209,6 +359,53 @@ class GeminiImageClient:
                 "thought_signature": None,
             }
 
+    async def agenerate_image(self, *args, **kwargs) -> dict:
+        """
+        Async variant of generate_image.
+
+        Runs the blocking HTTP call in a worker thread so callers can
+        asyncio.gather() several generations/critiques concurrently.
+        The pooled session is thread-safe for this usage.
+        """
+        return await asyncio.to_thread(self.generate_image, *args, **kwargs)
+
+    async def aanalyze_image(self, image_path: str, analysis_prompt: str) -> dict:
+        """Async variant of analyze_image (see agenerate_image)."""
+        return await asyncio.to_thread(self.analyze_image, image_path, analysis_prompt)
+
+    async def agenerate_images_batch(
+        self,
+        items: list[dict],
+        concurrency: int = 4,
+    ) -> list:
+        """
+        Generate several images concurrently.
+
+        Args:
+            items: List of generate_image keyword-argument dicts
+                (each needs its own output_path)
+            concurrency: Max requests in flight at once - keep modest to
+                stay inside API rate limits
+
+        Returns:
+            List of result dicts in the same order as items; an entry is
+            the raised exception if that request failed unexpectedly.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def generate_one(kwargs: dict):
+            async with semaphore:
+                return await self.agenerate_image(**kwargs)
+
+        return await asyncio.gather(
+            *(generate_one(item) for item in items),
+            return_exceptions=True,
+        )
+
+    def close(self):
+        """Close the underlying HTTP session."""
+        self._session.close()
+
     def analyze_image(self, image_path: str, analysis_prompt: str) -> dict:
         """
         Analyze an image without generating a new one.
@@ -217,15 +414,27 @@ class GeminiImageClient:
         Returns:
             dict with keys: success, analysis, error
         """
-        # Use the regular Gemini model for analysis (not image generation)
-        analysis_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+        img_data, mime_type = self._image_to_base64(image_path)
+        return self.analyze_image_encoded(img_data, mime_type, analysis_prompt)
 
-        headers = {
-            "x-goog-api-key": self.api_key,
-            "Content-Type": "application/json",
-        }
+    def analyze_image_encoded(
+        self,
+        img_b64: str,
+        mime_type: str,
+        analysis_prompt: str,
+        response_mime_type: Optional[str] = None,
+        response_schema: Optional[dict] = None,
+    ) -> dict:
+        """
+        Analyze an already-encoded image (see analyze_image).
 
-        img_data, mime_type = self._image_to_base64(image_path)
+        Callers that hold the (base64, mime_type) pair - e.g. the critic
+        doing several passes over one image - skip the file read + encode.
+        Pass response_mime_type="application/json" (optionally with a
+        response_schema) to constrain the model's output.
+        """
+        # Use the regular Gemini model for analysis (not image generation)
+        analysis_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
 
         body = {
             "contents": [{
@@ -233,7 +442,7 @@ class GeminiImageClient:
                     {
                         "inlineData": {
                             "mimeType": mime_type,
-                            "data": img_data
+                            "data": img_b64
                         }
                     },
                     {"text": analysis_prompt}
@@ -241,11 +450,15 @@ class GeminiImageClient:
             }]
         }
 
+        if response_mime_type:
+            body["generationConfig"] = {"responseMimeType": response_mime_type}
+            if response_schema:
+                body["generationConfig"]["responseSchema"] = response_schema
+
         try:
-            response = requests.post(
+            response = self._session.post(
                 analysis_url,
-                headers=headers,
-                json=body,
+                data=orjson.dumps(body),
                 timeout=60
             )
 
@@ -256,7 +469,7 @@ class GeminiImageClient:
                     "error": f"API error {response.status_code}: {response.text}",
                 }
 
-            response_data = response.json()
+            response_data = orjson.loads(response.content)
             text = self._extract_text_response(response_data)
 
             return {
@@ -4,12 +4,74 @@ Grid overlay utility for painting reference images.
 Adds a proportional grid to help transfer the image to canvas.
 """
 
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from PIL import Image, ImageDraw
+
+import numpy as np
+from PIL import Image
+
+
+@functools.lru_cache(maxsize=16)
+def _compute_grid_coords(
+    img_width: int,
+    img_height: int,
+    grid_size_cm: float,
+    canvas_width_cm: float,
+    canvas_height_cm: float,
+    major_every: int,
+) -> tuple:
+    """
+    Compute grid geometry for an image/canvas combination.
+
+    Cached because every version in a session shares dimensions and grid
+    parameters, so the float math runs once per session instead of per file.
+
+    Returns:
+        (effective_width_cm, effective_height_cm, cols, rows,
+         xs_minor, ys_minor, xs_major, ys_major)
+    """
+    img_aspect = img_width / img_height
+    canvas_aspect = canvas_width_cm / canvas_height_cm
+
+    # Determine how to fit the image to canvas
+    # The image will be scaled to fit within the canvas, maintaining aspect ratio
+    if img_aspect > canvas_aspect:
+        # Image is wider than canvas - fit to width
+        effective_width_cm = canvas_width_cm
+        effective_height_cm = canvas_width_cm / img_aspect
+    else:
+        # Image is taller than canvas - fit to height
+        effective_height_cm = canvas_height_cm
+        effective_width_cm = canvas_height_cm * img_aspect
+
+    # Calculate number of grid squares (at least 1)
+    cols = max(1, int(effective_width_cm / grid_size_cm))
+    rows = max(1, int(effective_height_cm / grid_size_cm))
+
+    x_spacing = img_width / cols
+    y_spacing = img_height / rows
+
+    xs = (np.arange(cols + 1) * x_spacing).astype(int)
+    ys = (np.arange(rows + 1) * y_spacing).astype(int)
+    is_major_x = (np.arange(cols + 1) % major_every) == 0
+    is_major_y = (np.arange(rows + 1) % major_every) == 0
+
+    return (
+        effective_width_cm,
+        effective_height_cm,
+        cols,
+        rows,
+        tuple(xs[~is_major_x].tolist()),
+        tuple(ys[~is_major_y].tolist()),
+        tuple(xs[is_major_x].tolist()),
+        tuple(ys[is_major_y].tolist()),
+    )
 
 
 def add_grid_overlay(
-    input_path: str,
+    input_image,  # str path or an already-open PIL.Image.Image
     output_path: str = None,
     grid_size_cm: float = 10.0,  # Size of each grid square in cm on your canvas
     canvas_width_cm: float = 80.0,  # Your canvas width in cm
@@ -20,6 +82,7 @@ def add_grid_overlay(
     major_width: int = 3,
     minor_width: int = 1,
     opacity: float = 0.7,
+    compress_level: int = 1,
 ) -> str:
     """
     Add a grid overlay to an image, scaled to match your canvas.
@@ -28,7 +91,9 @@ def add_grid_overlay(
     on your canvas (using grid_size_cm), the proportions will match.
 
     Args:
-        input_path: Path to input image
+        input_image: Path to input image, or an already-decoded PIL Image
+            (skips the redundant decode when the caller holds one; requires
+            an explicit output_path)
         output_path: Path for output (default: adds _grid suffix)
         grid_size_cm: Size of minor grid squares on your canvas (cm)
         canvas_width_cm: Your canvas width in cm
@@ -39,93 +104,67 @@ def add_grid_overlay(
         major_width: Line width for major grid
         minor_width: Line width for minor grid
         opacity: Grid opacity (0-1)
+        compress_level: PNG compression level (default 1 - these are working
+            references, not archival masters; level 1 encodes ~5x faster
+            than Pillow's default 6 for ~15% larger files. Use 6+ for
+            archival output.)
 
     Returns:
         Path to output image
     """
-    if output_path is None:
-        p = Path(input_path)
-        output_path = str(p.parent / f"{p.stem}_grid{p.suffix}")
-
-    # Open image
-    img = Image.open(input_path).convert("RGBA")
+    if isinstance(input_image, Image.Image):
+        if output_path is None:
+            raise ValueError("output_path is required when passing a PIL image")
+        img = input_image
+    else:
+        if output_path is None:
+            p = Path(input_image)
+            output_path = str(p.parent / f"{p.stem}_grid{p.suffix}")
+        img = Image.open(input_image)
+
+    # Only convert when needed - convert("RGB") copies the whole image
+    # even when the mode already matches
+    if img.mode != "RGB":
+        img = img.convert("RGB")
     img_width, img_height = img.size
 
-    # Calculate image aspect ratio
-    img_aspect = img_width / img_height
-    canvas_aspect = canvas_width_cm / canvas_height_cm
-
-    print(f"Image size: {img_width}x{img_height} (aspect: {img_aspect:.3f})")
-    print(f"Canvas size: {canvas_width_cm}x{canvas_height_cm}cm (aspect: {canvas_aspect:.3f})")
-
-    # Determine how to fit the image to canvas
-    # The image will be scaled to fit within the canvas, maintaining aspect ratio
-    if img_aspect > canvas_aspect:
-        # Image is wider than canvas - fit to width
-        effective_width_cm = canvas_width_cm
-        effective_height_cm = canvas_width_cm / img_aspect
-    else:
-        # Image is taller than canvas - fit to height
-        effective_height_cm = canvas_height_cm
-        effective_width_cm = canvas_height_cm * img_aspect
+    (effective_width_cm, effective_height_cm, cols, rows,
+     xs_minor, ys_minor, xs_major, ys_major) = _compute_grid_coords(
+        img_width, img_height, grid_size_cm,
+        canvas_width_cm, canvas_height_cm, major_every,
+    )
 
+    print(f"Image size: {img_width}x{img_height} (aspect: {img_width / img_height:.3f})")
+    print(f"Canvas size: {canvas_width_cm}x{canvas_height_cm}cm (aspect: {canvas_width_cm / canvas_height_cm:.3f})")
     print(f"Effective painting area: {effective_width_cm:.1f}x{effective_height_cm:.1f}cm")
-
-    # Calculate number of grid squares
-    cols = int(effective_width_cm / grid_size_cm)
-    rows = int(effective_height_cm / grid_size_cm)
-
-    # Ensure at least 1 square
-    cols = max(1, cols)
-    rows = max(1, rows)
-
     print(f"Grid: {cols}x{rows} squares ({grid_size_cm}cm each)")
     print(f"Major lines every {major_every} squares ({grid_size_cm * major_every}cm)")
 
-    # Create transparent overlay for grid
-    overlay = Image.new("RGBA", (img_width, img_height), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(overlay)
-
-    # Calculate pixel spacing for grid squares
-    x_spacing = img_width / cols
-    y_spacing = img_height / rows
-
-    # Draw minor grid lines first (so major lines are on top)
-    minor_rgba = (*minor_color, int(255 * opacity))
-
-    # All vertical lines
-    for i in range(cols + 1):
-        x = int(i * x_spacing)
-        is_major = (i % major_every == 0)
-        if not is_major:
-            draw.line([(x, 0), (x, img_height)], fill=minor_rgba, width=minor_width)
-
-    # All horizontal lines
-    for i in range(rows + 1):
-        y = int(i * y_spacing)
-        is_major = (i % major_every == 0)
-        if not is_major:
-            draw.line([(0, y), (img_width, y)], fill=minor_rgba, width=minor_width)
-
-    # Draw major grid lines
-    major_rgba = (*major_color, int(255 * opacity))
-
-    # Vertical major lines
-    for i in range(0, cols + 1, major_every):
-        x = int(i * x_spacing)
-        draw.line([(x, 0), (x, img_height)], fill=major_rgba, width=major_width)
-
-    # Horizontal major lines
-    for i in range(0, rows + 1, major_every):
-        y = int(i * y_spacing)
-        draw.line([(0, y), (img_width, y)], fill=major_rgba, width=major_width)
-
-    # Composite overlay onto original
-    result = Image.alpha_composite(img, overlay)
-
-    # Convert back to RGB for saving as PNG/JPG
-    result = result.convert("RGB")
-    result.save(output_path)
+    # Blend the grid lines directly into the RGB pixels - the lines cover
+    # <1% of the image, so blending only those slabs beats building a
+    # full-size RGBA overlay and alpha-compositing every pixel
+    src = np.asarray(img)
+    arr = src.copy()
+
+    def blend(slices, color, width):
+        """Blend `color` at `opacity` over the original pixels of each slab."""
+        rgb = np.array(color, dtype=np.float32) * opacity
+        for vertical, pos in slices:
+            lo = max(0, pos - width // 2)
+            hi = pos + width // 2 + 1
+            sl = (slice(None), slice(lo, hi)) if vertical else (slice(lo, hi), slice(None))
+            arr[sl] = (src[sl] * (1 - opacity) + rgb).astype(np.uint8)
+
+    # Minor grid lines first (so major lines win at crossings)
+    blend([(True, x) for x in xs_minor]
+          + [(False, y) for y in ys_minor], minor_color, minor_width)
+    blend([(True, x) for x in xs_major]
+          + [(False, y) for y in ys_major], major_color, major_width)
+
+    save_kwargs = {}
+    if str(output_path).lower().endswith(".png"):
+        save_kwargs = {"compress_level": compress_level, "optimize": False}
+    Image.fromarray(arr).save(output_path, **save_kwargs)
 
     return output_path
 
@@ -142,14 +181,16 @@ def add_grid_to_session(session_dir: str, **grid_kwargs) -> list[str]:
         List of paths to gridded images
     """
     session_path = Path(session_dir)
-    gridded = []
 
     # Find all final version images
-    for img_path in sorted(session_path.glob("v*_final.png")):
-        output_path = add_grid_overlay(str(img_path), **grid_kwargs)
-        gridded.append(output_path)
-
-    return gridded
+    paths = sorted(session_path.glob("v*_final.png"))
+    if not paths:
+        return []
+
+    # Each image is independent, and PIL releases the GIL during
+    # decode/encode - grid all versions in parallel
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1, len(paths))) as ex:
+        return list(ex.map(lambda p: add_grid_overlay(str(p), **grid_kwargs), paths))
 
 
 if __name__ == "__main__":
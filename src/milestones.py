@@ -235,13 +235,25 @@ Final adjustments - the hardest part: knowing when NOT to add more.
 
 def get_milestone(version: int) -> dict:
     """Get milestone definition by version number (1-10)."""
+    if not 1 <= version <= len(MILESTONES):
+        raise ValueError(
+            f"Version {version} not found. Valid versions: 1-{len(MILESTONES)}"
+        )
     return MILESTONES[version - 1]
 
 
+# One cumulative string per milestone, built once at import - calling
+# this per version in a loop was O(V^2) string churn
+_CUMULATIVE = []
+_parts = []
+for _m in MILESTONES:
+    _parts.append(f"v{_m['version']} ({_m['name']}): {_m['focus']}")
+    _CUMULATIVE.append("\n".join(_parts))
+del _parts, _m
+
+
 def get_cumulative_context(up_to_version: int) -> str:
     """Get context from all previous milestones for coherence."""
-    context_parts = []
-    for i in range(up_to_version):
-        m = MILESTONES[i]
-        context_parts.append(f"v{m['version']} ({m['name']}): {m['focus']}")
-    return "\n".join(context_parts)
+    if up_to_version <= 0:
+        return ""
+    return _CUMULATIVE[up_to_version - 1]
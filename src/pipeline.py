@@ -9,16 +9,52 @@ This is the core orchestration that:
 5. Ensures coherence across the full series
 """
 
+import functools
+import logging
 import os
-import json
+import orjson
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from pathlib import Path
-from datetime import datetime
 from typing import Optional
 import shutil
+import time
 
 from .gemini_client import GeminiImageClient
-from .prompts import get_prompt, get_prompt_for_retry, NUM_VERSIONS, PROMPTS
+from .prompts import (
+    get_prompt_for_retry,
+    get_system_prompt,
+    get_user_prompt,
+    NUM_VERSIONS,
+    PROMPTS,
+)
 from .critique import ImageCritic
+from .response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class AttemptRecord:
+    """One generate+critique attempt within a version."""
+    iteration: int
+    success: bool
+    image_path: Optional[str] = None
+    score: int = 0
+    passed: bool = False
+    issues: list = field(default_factory=list)
+    critique: str = ""
+    thought_signature: Optional[str] = None
+    error: Optional[str] = None
+
+
+@functools.lru_cache(maxsize=4)
+def _get_client(api_key: Optional[str]) -> GeminiImageClient:
+    """
+    One client per API key - batch scripts that build many pipelines share
+    the pooled HTTP session and its reference-image caches.
+    """
+    return GeminiImageClient(api_key)
 
 
 class PaintingPipeline:
@@ -31,11 +67,78 @@ class PaintingPipeline:
         self,
         output_dir: str = "output",
         api_key: Optional[str] = None,
+        use_response_cache: bool = False,
     ):
-        self.client = GeminiImageClient(api_key)
+        self.client = _get_client(api_key)
         self.critic = ImageCritic(self.client)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Opt-in: replays identical (prompt, reference) generations from
+        # disk. A developer-iteration tool - generation is stochastic, and
+        # rerunning an unchanged photo to get a different take is the
+        # normal tuning workflow, so fresh calls stay the default.
+        self._response_cache = (
+            ResponseCache(self.output_dir / ".response_cache.sqlite")
+            if use_response_cache else None
+        )
+
+    def _cached_generate(self, **gen_kwargs) -> dict:
+        """
+        generate_image with a local response-cache wrapper.
+
+        Keys combine the full prompt content (system + user + image config)
+        with the encoded reference image, so any prompt edit or new photo
+        misses cleanly. The thought signature is deliberately excluded - it
+        varies per run but is determined by the same reference lineage.
+
+        Note: parallel retries of a version share one key (same retry
+        prompt and reference), so on a replay run the retry attempts
+        collapse into the single stored image - expected for a replay.
+        """
+        cache = self._response_cache
+        if cache is None:
+            return self.client.generate_image(**gen_kwargs)
+
+        reference_b64 = gen_kwargs.get("reference_image_b64")
+        if reference_b64 is None and gen_kwargs.get("reference_image_path"):
+            reference_b64 = self.client._image_to_base64(
+                gen_kwargs["reference_image_path"]
+            )
+
+        key = ResponseCache.make_key(
+            "\x1f".join([
+                gen_kwargs.get("system_instruction") or "",
+                gen_kwargs["prompt"],
+                gen_kwargs.get("aspect_ratio", ""),
+                gen_kwargs.get("image_size", ""),
+            ]),
+            reference_b64[0] if reference_b64 else "",
+        )
+
+        hit = cache.get(key)
+        if hit is not None:
+            output_path = gen_kwargs["output_path"]
+            Path(output_path).write_bytes(hit["image"])
+            logger.warning(
+                "REPLAYING CACHED GENERATION for %s - no API call made. "
+                "Omit --response-cache for fresh output.",
+                output_path,
+            )
+            return {
+                "success": True,
+                "image_path": output_path,
+                "text_response": hit["meta"].get("text_response"),
+                "thought_signature": hit["meta"].get("thought_signature"),
+                "error": None,
+            }
+
+        result = self.client.generate_image(**gen_kwargs)
+        if result["success"]:
+            cache.put(key, Path(result["image_path"]).read_bytes(), {
+                "text_response": result.get("text_response"),
+                "thought_signature": result.get("thought_signature"),
+            })
+        return result
 
     def generate_version(
         self,
@@ -44,66 +147,72 @@ class PaintingPipeline:
         session_dir: Path,
         previous_image_path: Optional[str] = None,
         thought_signature: Optional[str] = None,
+        pregenerated_first=None,
+        on_first_attempt_image=None,
     ) -> dict:
         """
         Generate a single version with self-critique loop.
 
+        Args:
+            pregenerated_first: Optional Future resolving to a speculative
+                generate_image result for attempt 1 (already writing to this
+                version's attempt-1 path) - used instead of generating
+            on_first_attempt_image: Optional callback(image_path, signature)
+                fired once attempt 1's image exists, before its critique -
+                lets the caller overlap the next version's generation with
+                this version's critique
+
         Returns:
-            dict with: success, image_path, thought_signature, attempts, final_score
+            dict with: success, image_path, thought_signature, attempts,
+            final_score, final_iteration
         """
         version_info = PROMPTS[version]
-        print(f"\n{'='*60}")
-        print(f"GENERATING VERSION {version}/{NUM_VERSIONS}: {version_info['name']}")
-        print(f"Focus: {version_info['focus']}")
-        print(f"{'='*60}")
-
-        attempts = []
-        best_result = None
-        best_score = 0
-
-        for iteration in range(self.MAX_ITERATIONS_PER_VERSION):
-            print(f"\n--- Attempt {iteration + 1}/{self.MAX_ITERATIONS_PER_VERSION} ---")
-
-            # Build prompt
-            is_retry = iteration > 0
-            previous_issues = attempts[-1]["issues"] if is_retry and attempts else []
-
-            if is_retry and previous_issues:
-                prompt = get_prompt_for_retry(version, previous_issues)
-            else:
-                prompt = get_prompt(version)
-
-            # Generate image
-            output_path = session_dir / f"v{version:02d}_attempt{iteration + 1}.png"
-
-            # Use previous version's output as reference for continuity (if available)
-            # Otherwise fall back to original input
-            reference_path = previous_image_path if previous_image_path else input_image_path
-
-            gen_result = self.client.generate_image(
+        bar = "=" * 60
+        logger.info(
+            "\n%s\nGENERATING VERSION %s/%s: %s\nFocus: %s\n%s",
+            bar, version, NUM_VERSIONS, version_info["name"], version_info["focus"], bar,
+        )
+
+        # Use previous version's output as reference for continuity (if available)
+        # Otherwise fall back to original input
+        reference_path = previous_image_path if previous_image_path else input_image_path
+
+        attempt_paths = [
+            session_dir / f"v{version:02d}_attempt{i + 1}.png"
+            for i in range(self.MAX_ITERATIONS_PER_VERSION)
+        ]
+
+        # Encode the reference once for all attempts of this version
+        reference_b64 = self.client._image_to_base64(reference_path)
+
+        def generate_attempt(iteration: int, prompt: str) -> dict:
+            """Generate one attempt image. Safe to run in a thread."""
+            return self._cached_generate(
                 prompt=prompt,
                 reference_image_path=reference_path,
-                output_path=str(output_path),
+                reference_image_b64=reference_b64,
+                output_path=str(attempt_paths[iteration]),
                 aspect_ratio="4:5",  # 80x100cm canvas
                 image_size="2K",
                 previous_thought_signature=thought_signature,
+                system_instruction=get_system_prompt(),
             )
 
+        def assess_attempt(iteration: int, gen_result: dict) -> AttemptRecord:
+            """Critique a generated attempt and build its record."""
+            output_path = attempt_paths[iteration]
+
             if not gen_result["success"]:
-                print(f"Generation failed: {gen_result['error']}")
-                attempts.append({
-                    "iteration": iteration + 1,
-                    "success": False,
-                    "error": gen_result["error"],
-                    "issues": ["Generation failed"],
-                    "score": 0,
-                })
-                continue
+                logger.info("[attempt %s] Generation failed: %s", iteration + 1, gen_result["error"])
+                return AttemptRecord(
+                    iteration=iteration + 1,
+                    success=False,
+                    error=gen_result["error"],
+                    issues=["Generation failed"],
+                )
 
-            print(f"Image generated: {output_path}")
+            logger.info("[attempt %s] Image generated: %s", iteration + 1, output_path)
 
-            # Self-critique
-            print("Running self-critique...")
             critique_result = self.critic.critique_image(
                 image_path=str(output_path),
                 version=version,
@@ -112,63 +221,153 @@ class PaintingPipeline:
 
             score = critique_result.get("overall_score", 0)
             passed = critique_result.get("passed", False)
+            logger.info("[attempt %s] Score: %s/10 - %s", iteration + 1, score, "PASS" if passed else "FAIL")
+
+            return AttemptRecord(
+                iteration=iteration + 1,
+                success=True,
+                image_path=str(output_path),
+                score=score,
+                passed=passed,
+                issues=critique_result.get("issues", []),
+                critique=critique_result.get("critique", ""),
+                thought_signature=gen_result.get("thought_signature"),
+            )
+
+        def run_attempt(iteration: int, prompt: str) -> AttemptRecord:
+            return assess_attempt(iteration, generate_attempt(iteration, prompt))
+
+        # First attempt runs alone - its critique seeds the retry prompt.
+        # If the caller speculatively generated it already, reuse that.
+        logger.info("\n--- Attempt 1/%s ---", self.MAX_ITERATIONS_PER_VERSION)
+        if pregenerated_first is not None:
+            # A raised speculation degrades to a failed attempt (same shape
+            # generate_image returns on error) so the normal retry loop
+            # handles it, instead of crashing the whole run
+            try:
+                first_gen = pregenerated_first.result()
+            except Exception as e:
+                logger.warning("Speculative generation for version %s raised: %s", version, e)
+                first_gen = {
+                    "success": False,
+                    "error": f"Speculative generation raised: {e}",
+                    "image_path": None,
+                    "text_response": None,
+                    "thought_signature": None,
+                }
+        else:
+            first_gen = generate_attempt(0, get_user_prompt(version))
+
+        # Let the caller overlap the next version's generation with this
+        # version's critique
+        if first_gen["success"] and on_first_attempt_image is not None:
+            on_first_attempt_image(
+                str(attempt_paths[0]),
+                first_gen.get("thought_signature"),
+            )
 
-            print(f"Score: {score}/10 - {'PASS' if passed else 'FAIL'}")
+        attempts = [assess_attempt(0, first_gen)]
+
+        first = attempts[0]
+        if not (first.passed and first.score >= self.MIN_SCORE_TO_PASS):
+            retries = self.MAX_ITERATIONS_PER_VERSION - 1
+            if retries > 0:
+                issues = first.issues
+                if issues:
+                    logger.info(
+                        "Issues to address:\n%s",
+                        "\n".join(f"  - {issue}" for issue in issues[:3]),
+                    )
+                    retry_prompt = get_prompt_for_retry(
+                        version, tuple(issues), include_foundation=False
+                    )
+                else:
+                    retry_prompt = get_user_prompt(version)
+
+                # Retries only depend on the previous version's image, not on
+                # each other - run them concurrently and keep the best
+                logger.info("\n--- Attempts 2-%s (parallel) ---", self.MAX_ITERATIONS_PER_VERSION)
+                with ThreadPoolExecutor(max_workers=retries) as executor:
+                    futures = [
+                        executor.submit(run_attempt, i, retry_prompt)
+                        for i in range(1, self.MAX_ITERATIONS_PER_VERSION)
+                    ]
+                    for future in as_completed(futures):
+                        attempts.append(future.result())
+        else:
+            logger.info("Version %s PASSED with score %s", version, first.score)
 
-            attempt_record = {
-                "iteration": iteration + 1,
-                "success": True,
-                "image_path": str(output_path),
-                "score": score,
-                "passed": passed,
-                "issues": critique_result.get("issues", []),
-                "critique": critique_result.get("critique", ""),
-                "thought_signature": gen_result.get("thought_signature"),
-            }
-            attempts.append(attempt_record)
-
-            # Track best result
-            if score > best_score:
-                best_score = score
-                best_result = attempt_record
-
-            # Check if passed
-            if passed and score >= self.MIN_SCORE_TO_PASS:
-                print(f"Version {version} PASSED with score {score}")
-                break
-            else:
-                if critique_result.get("issues"):
-                    print("Issues to address:")
-                    for issue in critique_result["issues"][:3]:
-                        print(f"  - {issue}")
+        best_result = None
+        best_score = 0
+        for attempt in attempts:
+            if attempt.success and attempt.score > best_score:
+                best_score = attempt.score
+                best_result = attempt
 
         # Use best result even if not perfect
         if best_result:
-            # Rename best attempt to final version
+            # Rename best attempt to final version - os.replace is atomic
+            # and skips the separate existence stat
             final_path = session_dir / f"v{version:02d}_final.png"
-            best_path = Path(best_result["image_path"])
-            if best_path.exists():
-                best_path.rename(final_path)
-                best_result["image_path"] = str(final_path)
+            try:
+                os.replace(best_result.image_path, final_path)
+                best_result.image_path = str(final_path)
+            except FileNotFoundError:
+                pass
 
             return {
                 "success": True,
+                "name": version_info["name"],
                 "image_path": str(final_path),
-                "thought_signature": best_result.get("thought_signature"),
+                "thought_signature": best_result.thought_signature,
                 "attempts": len(attempts),
                 "final_score": best_score,
-                "passed": best_result.get("passed", False),
+                "passed": best_result.passed,
+                "final_iteration": best_result.iteration,
             }
 
         return {
             "success": False,
+            "name": version_info["name"],
             "image_path": None,
             "thought_signature": None,
             "attempts": len(attempts),
             "final_score": 0,
             "passed": False,
+            "final_iteration": None,
         }
 
+    async def agenerate_all_versions(
+        self,
+        input_image_path: str,
+        session_dir: Path,
+        concurrency: int = NUM_VERSIONS,
+    ) -> list:
+        """
+        Generate all five versions concurrently from the source photo.
+
+        Unlike run_full_pipeline, every version references the original
+        photo rather than the previous version's output - the value studies
+        are logically independent, so the calls can go out as one
+        semaphore-bounded wave (no critique loop, no chaining). Wall time
+        is ~one generation instead of five.
+
+        Returns the generate_image result dicts in version order.
+        """
+        session_dir.mkdir(parents=True, exist_ok=True)
+        items = [
+            {
+                "prompt": get_user_prompt(v),
+                "system_instruction": get_system_prompt(),
+                "reference_image_path": input_image_path,
+                "output_path": str(session_dir / f"v{v:02d}_draft.png"),
+                "aspect_ratio": "4:5",
+                "image_size": "2K",
+            }
+            for v in range(1, NUM_VERSIONS + 1)
+        ]
+        return await self.client.agenerate_images_batch(items, concurrency=concurrency)
+
     def run_full_pipeline(
         self,
         input_image_path: str,
@@ -185,20 +384,23 @@ class PaintingPipeline:
             dict with: success, session_dir, versions (list of results), summary
         """
         # Create session directory
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        session_name = session_name or Path(input_image_path).stem
+        src_path = Path(input_image_path)
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        session_name = session_name or src_path.stem
         session_dir = self.output_dir / f"{session_name}_{timestamp}"
         session_dir.mkdir(parents=True, exist_ok=True)
 
-        print(f"\n{'#'*60}")
-        print(f"PAINTING PIPELINE - {session_name}")
-        print(f"Versions: {NUM_VERSIONS}")
-        print(f"Output: {session_dir}")
-        print(f"{'#'*60}")
+        bar = "#" * 60
+        logger.info(
+            "\n%s\nPAINTING PIPELINE - %s\nVersions: %s\nOutput: %s\n%s",
+            bar, session_name, NUM_VERSIONS, session_dir, bar,
+        )
 
         # Copy input image to session
-        input_copy = session_dir / f"00_original{Path(input_image_path).suffix}"
-        shutil.copy(input_image_path, input_copy)
+        input_copy = session_dir / f"00_original{src_path.suffix}"
+        # copyfile (not copy) skips the permission-bit stat+chmod and uses
+        # the kernel's zero-copy fast path for the multi-MB source photo
+        shutil.copyfile(input_image_path, input_copy)
 
         results = {
             "success": True,
@@ -211,50 +413,114 @@ class PaintingPipeline:
         previous_image_path = None
         thought_signature = None
 
-        # Generate each version sequentially
-        for version in range(1, NUM_VERSIONS + 1):
-            version_result = self.generate_version(
-                input_image_path=input_image_path,
-                version=version,
-                session_dir=session_dir,
-                previous_image_path=previous_image_path,
-                thought_signature=thought_signature,
-            )
-
-            results["versions"].append({
-                "version": version,
-                "name": PROMPTS[version]["name"],
-                **version_result,
-            })
-
-            if version_result["success"]:
-                previous_image_path = version_result["image_path"]
-                thought_signature = version_result.get("thought_signature")
-            else:
-                print(f"\nWARNING: Version {version} failed, continuing with previous...")
+        # Speculative first attempts: while version N's first attempt is
+        # being critiqued, version N+1's first generation already runs off
+        # N's attempt-1 image. The speculation is only used if N actually
+        # finalized on attempt 1 (otherwise the reference was wrong).
+        speculative: dict[int, object] = {}
+
+        with ThreadPoolExecutor(max_workers=1) as spec_pool:
+
+            def speculate_next(version: int):
+                def kick(image_path: str, signature: Optional[str]):
+                    next_version = version + 1
+                    if next_version > NUM_VERSIONS:
+                        return
+                    # Encode the reference here, on the main thread - kick
+                    # runs strictly before this version's critique and thus
+                    # before the attempt1 -> final rename. Handing the
+                    # worker only the encoded bytes means it never reads
+                    # the renameable path and can't lose that race.
+                    reference_b64 = self.client._image_to_base64(image_path)
+                    next_path = session_dir / f"v{next_version:02d}_attempt1.png"
+                    speculative[next_version] = spec_pool.submit(
+                        self._cached_generate,
+                        prompt=get_user_prompt(next_version),
+                        reference_image_b64=reference_b64,
+                        output_path=str(next_path),
+                        aspect_ratio="4:5",
+                        image_size="2K",
+                        previous_thought_signature=signature,
+                        system_instruction=get_system_prompt(),
+                    )
+                return kick
+
+            # Generate each version sequentially
+            for version in range(1, NUM_VERSIONS + 1):
+                pregenerated = speculative.pop(version, None)
+
+                version_result = self.generate_version(
+                    input_image_path=input_image_path,
+                    version=version,
+                    session_dir=session_dir,
+                    previous_image_path=previous_image_path,
+                    thought_signature=thought_signature,
+                    pregenerated_first=pregenerated,
+                    on_first_attempt_image=speculate_next(version),
+                )
+
+                results["versions"].append({
+                    "version": version,
+                    **version_result,
+                })
 
-        # Generate summary
-        passed_count = sum(1 for v in results["versions"] if v.get("passed", False))
-        avg_score = sum(v.get("final_score", 0) for v in results["versions"]) / NUM_VERSIONS
+                # Persist progress after every version so a crashed run
+                # still leaves inspectable metadata
+                results_path = session_dir / "results.json"
+                results_path.write_bytes(
+                    orjson.dumps(results, option=orjson.OPT_INDENT_2)
+                )
+
+                if version_result["success"]:
+                    previous_image_path = version_result["image_path"]
+                    thought_signature = version_result.get("thought_signature")
+                else:
+                    logger.warning("\nWARNING: Version %s failed, continuing with previous...", version)
+
+                # A speculation for version+1 is only valid if this version
+                # finalized on its first attempt (the speculative reference);
+                # otherwise wait it out and regenerate normally. The result
+                # is discarded, so a raising speculation must not take the
+                # pipeline down with it.
+                if speculative and (
+                    not version_result["success"]
+                    or version_result.get("final_iteration") != 1
+                ):
+                    stale = speculative.pop(version + 1, None)
+                    if stale is not None:
+                        try:
+                            stale.result()
+                        except Exception as e:
+                            logger.warning(
+                                "Discarded speculative generation raised: %s", e
+                            )
+
+        # Generate summary - one pass over the version results
+        passed_count = 0
+        total_score = 0
+        total_attempts = 0
+        for v in results["versions"]:
+            passed_count += v.get("passed", False)
+            total_score += v.get("final_score", 0)
+            total_attempts += v.get("attempts", 0)
+        avg_score = total_score / NUM_VERSIONS
 
         results["summary"] = {
             "versions_passed": passed_count,
             "versions_total": NUM_VERSIONS,
             "average_score": round(avg_score, 1),
-            "total_attempts": sum(v.get("attempts", 0) for v in results["versions"]),
+            "total_attempts": total_attempts,
         }
 
-        # Save results to JSON
+        # Save final results (now including the summary)
         results_path = session_dir / "results.json"
-        with open(results_path, "w") as f:
-            json.dump(results, f, indent=2)
+        results_path.write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2))
 
-        print(f"\n{'#'*60}")
-        print("PIPELINE COMPLETE")
-        print(f"Versions passed: {passed_count}/{NUM_VERSIONS}")
-        print(f"Average score: {avg_score:.1f}/10")
-        print(f"Results saved to: {results_path}")
-        print(f"{'#'*60}")
+        logger.info(
+            "\n%s\nPIPELINE COMPLETE\nVersions passed: %s/%s\n"
+            "Average score: %.1f/10\nResults saved to: %s\n%s",
+            bar, passed_count, NUM_VERSIONS, avg_score, results_path, bar,
+        )
 
         return results
 
@@ -265,12 +531,14 @@ def main():
     from dotenv import load_dotenv
 
     load_dotenv(override=True)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
 
     parser = argparse.ArgumentParser(
         description="Generate progressive painting studies"
     )
     parser.add_argument(
         "input_image",
+        nargs="?",
         help="Path to the source photo"
     )
     parser.add_argument(
@@ -282,10 +550,64 @@ def main():
         "--name",
         help="Session name (default: input filename)"
     )
+    parser.add_argument(
+        "--batch-dir",
+        help="Process every photo in this directory instead of a single image"
+    )
+    parser.add_argument(
+        "--response-cache",
+        action="store_true",
+        help="Replay cached generations for unchanged (prompt, photo) pairs "
+             "instead of calling the API (for iterating on non-prompt code)"
+    )
 
     args = parser.parse_args()
-
-    pipeline = PaintingPipeline(output_dir=args.output_dir)
+    use_cache = args.response_cache
+
+    if args.batch_dir:
+        # Sessions for different photos are independent and the work is
+        # dominated by Gemini round trips - run a few in parallel. The
+        # pipelines share one client (pooled session + 429 retries).
+        photos = sorted(
+            p for p in Path(args.batch_dir).iterdir()
+            if p.suffix.lower() in GeminiImageClient.MIME_TYPES
+        )
+        if not photos:
+            parser.error(f"No images found in {args.batch_dir}")
+
+        def run_one(photo: Path):
+            pipeline = PaintingPipeline(
+                output_dir=args.output_dir, use_response_cache=use_cache
+            )
+            # One unreadable photo must not abort the rest of the batch
+            try:
+                return pipeline.run_full_pipeline(input_image_path=str(photo))
+            except Exception:
+                logger.exception("Photo %s failed", photo)
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(4, len(photos))) as executor:
+            batch_results = list(executor.map(run_one, photos))
+
+        # A photo counts as failed if its pipeline crashed or any of its
+        # versions failed to produce an image
+        failed = [
+            str(photo)
+            for photo, r in zip(photos, batch_results)
+            if r is None or not all(v["success"] for v in r["versions"])
+        ]
+        logger.info(
+            "\nBatch complete: %s/%s photos succeeded",
+            len(batch_results) - len(failed), len(batch_results),
+        )
+        if failed:
+            logger.warning("Failed photos:\n%s", "\n".join(f"  - {p}" for p in failed))
+        return 1 if failed else 0
+
+    if not args.input_image:
+        parser.error("input_image is required (or use --batch-dir)")
+
+    pipeline = PaintingPipeline(output_dir=args.output_dir, use_response_cache=use_cache)
     results = pipeline.run_full_pipeline(
         input_image_path=args.input_image,
         session_name=args.name,
@@ -11,11 +11,28 @@ Each prompt has been tested and refined. When modifying:
 3. Document what changed and why in the version notes
 """
 
-# =============================================================================
-# CONFIGURATION
-# =============================================================================
+import functools
+import hashlib
+import os
+import re
+import string
+from pathlib import Path
+from types import MappingProxyType
+
+import orjson
+import yaml
+
+# Whitespace normalization applied to all prompt text at import: trailing
+# spaces and runs of blank lines tokenize into real input tokens on every
+# call without adding information
+_TRAILING_WS_RE = re.compile(r"[ \t]+\n")
+_BLANK_RUN_RE = re.compile(r"\n{3,}")
+
+
+def _strip_token_waste(text: str) -> str:
+    """Trim trailing whitespace and collapse 3+ newlines to a blank line."""
+    return _BLANK_RUN_RE.sub("\n\n", _TRAILING_WS_RE.sub("\n", text)).strip()
 
-NUM_VERSIONS = 5
 
 # =============================================================================
 # STYLE FOUNDATION - Used in all prompts
@@ -43,180 +60,223 @@ DO NOT render details. Suggest everything with VALUE and SHAPE.
 The rougher and sketchier, the better - while keeping the likeness.
 """
 
+STYLE_FOUNDATION = _strip_token_waste(STYLE_FOUNDATION)
+
 # =============================================================================
-# VERSION-SPECIFIC PROMPTS (5 VERSIONS)
+# VERSION-SPECIFIC PROMPTS
 # =============================================================================
 
-PROMPTS = {
-    1: {
-        "name": "Notan",
-        "focus": "2-value light/dark pattern",
-        "learning": "Seeing the big shape of light vs dark",
-        "prompt": """Create a 2-VALUE NOTAN study of this photo.
-
-{style_foundation}
-
-VERSION 1 - NOTAN (2 VALUES ONLY):
-This is NOT a painting - it's a value map.
-
-RULES:
-- ONLY 2 VALUES: Black and White. Nothing else.
-- Every area must be either BLACK or WHITE
-- Squint at the photo - what reads as "light"? That's white.
-- Everything else is black.
-- The SHAPE of the light pattern is what matters
-
-The silhouette and gesture must be recognizable.
-The face is just shapes - light shape for the lit side, dark for shadow.
-No features, no gradients, no in-between values.
-
-This helps you see: Where is the light? Where is the shadow?
-""",
-        "version_notes": "v2.0 - True 2-value notan for learning light patterns"
-    },
-
-    2: {
-        "name": "3-Value",
-        "focus": "Adding a mid-tone",
-        "learning": "Seeing the halftone zone",
-        "prompt": """Create a 3-VALUE study of this photo.
-
-{style_foundation}
-
-VERSION 2 - THREE VALUES:
-- BLACK (darkest darks, core shadows)
-- GRAY (halftones, turning forms)
-- WHITE (direct light, highlights)
-
-Now you can show FORM - where light turns to shadow.
-The gray is the transition zone.
-
-Still NO features - eyes are dark shapes, not drawn.
-The face is sculpted with these 3 values like a simple clay model.
-Keep it blocky and simple.
-
-This helps you see: How does the form turn from light to shadow?
-""",
-        "version_notes": "v2.0 - 3-value study for understanding form"
-    },
-
-    3: {
-        "name": "5-Value",
-        "focus": "Full value range",
-        "learning": "Seeing subtle value shifts",
-        "prompt": """Create a 5-VALUE study of this photo.
-
-{style_foundation}
-
-VERSION 3 - FIVE VALUES:
-1. White (brightest lights)
-2. Light gray (lighter halftones)
-3. Mid gray (middle values)
-4. Dark gray (darker halftones)
-5. Black (darkest accents)
-
-Now you have a full value range to work with.
-The face starts to have dimension and presence.
-Features are still SHAPES made of value - not drawn lines.
-
-Eyes: dark shape + light accent = presence (no iris detail)
-Mouth: value change suggests expression (no teeth)
-
-This helps you see: The full range of values that create dimension.
-""",
-        "version_notes": "v2.0 - 5-value for full tonal range"
-    },
-
-    4: {
-        "name": "Edges",
-        "focus": "Lost and found edges",
-        "learning": "Where to blur, where to sharpen",
-        "prompt": """Add EDGE VARIATION to the value study.
-
-{style_foundation}
-
-VERSION 4 - EDGES:
-Using the same values, now vary the EDGES:
-- LOST edges: where form dissolves into background (hair edges, shadow sides)
-- SOFT edges: where forms turn gradually
-- FIRM edges: most edges, clear but not sharp
-- SHARP edges: only at focal point (usually near the eyes)
-
-Only 10-20% of edges should be sharp.
-50% or more can be lost or very soft.
-
-The figure should feel like it's emerging from atmosphere.
-Hair and shoulders dissolve. Eyes stay defined.
-
-This helps you see: Edge hierarchy creates focus and atmosphere.
-""",
-        "version_notes": "v2.0 - Edge control for atmosphere"
-    },
-
-    5: {
-        "name": "Temperature",
-        "focus": "Warm lights, cool shadows",
-        "learning": "Color temperature in grays",
-        "prompt": """Add subtle COLOR TEMPERATURE to the study.
-
-{style_foundation}
-
-VERSION 5 - TEMPERATURE:
-Still essentially monochromatic, but with temperature shifts:
-- WARM (slightly yellow/orange) in the lights
-- COOL (slightly blue/purple) in the shadows
-
-This is very subtle - you should barely notice the color.
-It's still a "gray" painting but with life.
-
-Keep all the value work and edge work from before.
-Just add this subtle temperature variation.
-
-The person must be recognizable with their exact expression.
-
-This helps you see: How temperature adds life to values.
-""",
-        "version_notes": "v2.0 - Temperature for final study"
-    },
+# Prompt text lives in prompts/<set>.yaml so tuning iterations are plain
+# data edits (diffable, no module recompile). Loaded once per set.
+PROMPTS_DIR = Path(__file__).resolve().parent.parent / "prompts"
+
+
+@functools.lru_cache(maxsize=None)
+def _load_prompt_set(set_name: str) -> dict:
+    """Load a prompt set from prompts/<set_name>.yaml, keyed by int version."""
+    with open(PROMPTS_DIR / f"{set_name}.yaml") as f:
+        data = yaml.safe_load(f)
+    prompts = {int(version): entry for version, entry in data.items()}
+    for entry in prompts.values():
+        entry["prompt"] = _strip_token_waste(entry["prompt"])
+    return prompts
+
+
+def _milestone_prompts() -> dict:
+    """Build a prompt set from the original 10-step INO progression."""
+    from .milestones import MILESTONES
+
+    return {
+        m["version"]: {
+            "name": m["name"],
+            "focus": m["focus"],
+            "learning": m["learning"],
+            "prompt": _strip_token_waste(m["prompt_guidance"]),
+            "version_notes": "v1.0 - original 10-step progression",
+        }
+        for m in MILESTONES
+    }
+
+
+# One authoritative registry instead of competing near-duplicate PROMPTS
+# definitions (the 5-version value-study set here and the 10-step set in
+# milestones.py). Select with PAINTING_PROMPT_SET for reproducible A/B
+# comparisons across sets.
+PROMPT_SETS = {
+    "value_study": _load_prompt_set("value_study"),
+    "milestones": _milestone_prompts(),
+}
+
+_ACTIVE_SET = os.environ.get("PAINTING_PROMPT_SET", "value_study")
+if _ACTIVE_SET not in PROMPT_SETS:
+    raise ValueError(
+        f"Unknown PAINTING_PROMPT_SET {_ACTIVE_SET!r}. "
+        f"Available sets: {sorted(PROMPT_SETS)}"
+    )
+
+# Read-only mapping: accidental mutation fails loudly, and lookups can
+# rely on KeyError instead of a separate membership test
+PROMPTS = MappingProxyType(PROMPT_SETS[_ACTIVE_SET])
+
+NUM_VERSIONS = len(PROMPTS)
+
+
+# Separator between the shared foundation prefix and the version body
+_FOUNDATION_SEPARATOR = "\n\n---\n\n"
+
+# Rendered once at import time - the same 10 strings are requested over
+# and over during a run, so get_prompt becomes a dict lookup.
+# STYLE_FOUNDATION always comes first: every rendered prompt shares a
+# byte-identical prefix, so provider prompt caches (Gemini implicit
+# caching, Anthropic cache_control, OpenAI prefix cache) can hit on the
+# longest shared chunk. Retry additions are appended at the end and
+# never invalidate the cached prefix.
+_RENDERED_PROMPTS = {
+    (v, include): (
+        "".join([STYLE_FOUNDATION, _FOUNDATION_SEPARATOR, data["prompt"]])
+        if include else data["prompt"]
+    )
+    for v, data in PROMPTS.items()
+    for include in (True, False)
 }
 
 
 def get_prompt(version: int, include_foundation: bool = True) -> str:
     """Get the prompt for a specific version."""
-    if version not in PROMPTS:
-        raise ValueError(f"Version {version} not found. Valid versions: 1-{NUM_VERSIONS}")
+    try:
+        return _RENDERED_PROMPTS[(version, include_foundation)]
+    except KeyError:
+        raise ValueError(
+            f"Version {version} not found. Valid versions: 1-{NUM_VERSIONS}"
+        ) from None
+
+
+def get_system_prompt() -> str:
+    """
+    The style foundation alone, for the provider's system slot.
+
+    Sending it as systemInstruction (Gemini) / system (Anthropic, OpenAI)
+    means the ~200 shared tokens are transmitted and cached once per
+    session instead of inlined into every user message.
+    """
+    return STYLE_FOUNDATION
+
+
+def get_user_prompt(version: int) -> str:
+    """The version body without the foundation (which travels as system)."""
+    return get_prompt(version, include_foundation=False)
+
+
+# Stable per-version cache keys derived from the rendered prompt content.
+# Pass as prompt_cache_key on OpenAI-compatible backends to pin identical
+# prefixes to the same routing bucket; also used to key local response
+# caching. Editing STYLE_FOUNDATION or a version's body changes the hash,
+# so stale cache entries invalidate themselves - no manual bumping.
+PROMPT_CACHE_KEYS = {
+    v: f"painting-asst-v{v}-{hashlib.sha1(_RENDERED_PROMPTS[(v, True)].encode()).hexdigest()[:16]}"
+    for v in PROMPTS
+}
+
+
+# Pre-serialized {"text": prompt} request parts - the prompt strings are
+# constants, so consumers that assemble raw JSON bodies line-by-line
+# (src/batch.py) splice these bytes instead of re-serializing the same
+# ~2KB of text for every photo
+_JSON_TEXT_PARTS = {
+    v: orjson.dumps({"text": _RENDERED_PROMPTS[(v, True)]})
+    for v in PROMPTS
+}
 
-    prompt_data = PROMPTS[version]
-    prompt = prompt_data["prompt"]
 
-    if include_foundation:
-        prompt = prompt.replace("{style_foundation}", STYLE_FOUNDATION)
+def get_prompt_json_part(version: int) -> bytes:
+    """Pre-serialized {"text": <full prompt>} JSON part for version."""
+    try:
+        return _JSON_TEXT_PARTS[version]
+    except KeyError:
+        raise ValueError(
+            f"Version {version} not found. Valid versions: 1-{NUM_VERSIONS}"
+        ) from None
+
+
+_RETRY_PRELUDE = "\n\nIMPORTANT - PREVIOUS ATTEMPT HAD THESE ISSUES TO FIX:\n"
+_RETRY_POSTLUDE = "\n\nPlease specifically address these problems in this generation.\n"
+
+
+@functools.lru_cache(maxsize=128)
+def get_prompt_for_retry(
+    version: int,
+    issues: tuple[str, ...],
+    include_foundation: bool = True,
+) -> str:
+    """
+    Get a prompt modified to address specific issues from previous attempt.
+
+    issues must be a tuple so repeated retries with the same issue set
+    (e.g. parallel attempts) reuse the built string. Pass
+    include_foundation=False when the foundation travels as the system
+    prompt.
+    """
+    if not issues:
+        return get_prompt(version, include_foundation)
+
+    if len(issues) == 1:
+        issues_text = "- " + issues[0]
     else:
-        prompt = prompt.replace("{style_foundation}", "")
+        issues_text = "\n".join(map("- ".__add__, issues))
 
-    return prompt
+    # One join sizes the buffer once - no template scan, no intermediates
+    return "".join([
+        get_prompt(version, include_foundation),
+        _RETRY_PRELUDE,
+        issues_text,
+        _RETRY_POSTLUDE,
+    ])
 
 
-def get_prompt_for_retry(version: int, issues: list[str]) -> str:
-    """Get a prompt modified to address specific issues from previous attempt."""
-    base_prompt = get_prompt(version)
+# Frozen so callers that mutate the shared mapping fail loudly
+_VERSION_NAMES = MappingProxyType({v: data["name"] for v, data in PROMPTS.items()})
 
-    issues_text = "\n".join(f"- {issue}" for issue in issues)
 
-    retry_addition = f"""
+def get_all_version_names() -> MappingProxyType:
+    """Get a read-only mapping of version numbers to names."""
+    return _VERSION_NAMES
 
-IMPORTANT - PREVIOUS ATTEMPT HAD THESE ISSUES TO FIX:
-{issues_text}
 
-Please specifically address these problems in this generation.
-"""
+# Compiled once - used by parse_batched_response
+_BATCH_DELIMITER_RE = re.compile(r"<<<V(\d+)>>>")
+
 
-    return base_prompt + retry_addition
+def get_batched_prompt(versions: tuple = (1, 2, 3, 4, 5)) -> str:
+    """
+    Build ONE prompt covering several versions' instructions.
 
+    Useful when rate-limited by requests-per-minute: the style foundation
+    is transmitted once instead of per version, and the whole set costs a
+    single RPM quota unit. Only applies where each version's answer is
+    text (e.g. critiques) - image generations still need one call each.
+
+    The model is asked to delimit each answer with <<<V#>>> markers;
+    parse_batched_response splits them back out.
+    """
+    blocks = [STYLE_FOUNDATION, _FOUNDATION_SEPARATOR]
+    for v in versions:
+        blocks.append(f"[[V{v}]]\n{get_prompt(v, include_foundation=False)}\n")
+    blocks.append(
+        "\nAnswer every [[V#]] block above, in order. Start each answer "
+        "with a line containing exactly <<<V#>>> (matching the block "
+        "number) and nothing else.\n"
+    )
+    return "".join(blocks)
 
-def get_all_version_names() -> dict[int, str]:
-    """Get a dict of version numbers to names."""
-    return {v: data["name"] for v, data in PROMPTS.items()}
+
+def parse_batched_response(text: str) -> dict[int, str]:
+    """Split a <<<V#>>>-delimited batched response into {version: answer}."""
+    parts = _BATCH_DELIMITER_RE.split(text)
+    # parts = [preamble, "1", answer1, "2", answer2, ...]
+    return {
+        int(parts[i]): parts[i + 1].strip()
+        for i in range(1, len(parts) - 1, 2)
+    }
 
 
 # =============================================================================
@@ -225,9 +285,9 @@ def get_all_version_names() -> dict[int, str]:
 
 CRITIQUE_PROMPT_TEMPLATE = """You are an art critic evaluating a painting study.
 
-This is VERSION {version} of {total} in a progressive painting series.
-Version name: {version_name}
-Focus: {version_focus}
+This is VERSION $version of $total in a progressive painting series.
+Version name: $version_name
+Focus: $version_focus
 
 STYLE CONTEXT:
 - Inspired by INO's technique (atmospheric, lost edges, economy)
@@ -243,8 +303,8 @@ Please evaluate:
    - Painterly quality (not airbrushed)?
 
 2. PROGRESSION CRITERIA:
-   - Does this feel like version {version}? (not too advanced, not too basic)
-   - Would a painter logically arrive here from version {prev_version}?
+   - Does this feel like version $version? (not too advanced, not too basic)
+   - Would a painter logically arrive here from version $prev_version?
 
 3. OVERALL SCORE (1-10)
 
@@ -253,17 +313,76 @@ Please evaluate:
 5. VERDICT: PASS (score >= 7) or FAIL (needs regeneration)
 
 Be strict but constructive.
+
+Respond ONLY with a JSON object, no prose around it:
+{"scores": {"value": int, "edges": int, "atmosphere": int, "painterly": int},
+ "progression_fit": int,
+ "overall": int,
+ "issues": ["critical issue", ...],
+ "verdict": "PASS" or "FAIL"}
 """
 
 
-def get_critique_prompt(version: int) -> str:
-    """Get the critique prompt for evaluating a specific version."""
-    prompt_data = PROMPTS[version]
+# Critique prompts are fixed per version - render them once with a
+# compiled Template ($-style placeholders leave the JSON example's
+# braces alone, unlike str.format)
+_CRITIQUE_TMPL = string.Template(CRITIQUE_PROMPT_TEMPLATE)
 
-    return CRITIQUE_PROMPT_TEMPLATE.format(
-        version=version,
+_RENDERED_CRITIQUES = {
+    v: _CRITIQUE_TMPL.substitute(
+        version=v,
         total=NUM_VERSIONS,
-        version_name=prompt_data["name"],
-        version_focus=prompt_data["focus"],
-        prev_version=version - 1 if version > 1 else "N/A"
+        version_name=data["name"],
+        version_focus=data["focus"],
+        prev_version=v - 1 if v > 1 else "N/A",
     )
+    for v, data in PROMPTS.items()
+}
+
+
+def get_critique_prompt(version: int) -> str:
+    """Get the critique prompt for evaluating a specific version."""
+    try:
+        return _RENDERED_CRITIQUES[version]
+    except KeyError:
+        raise ValueError(
+            f"Version {version} not found. Valid versions: 1-{NUM_VERSIONS}"
+        ) from None
+
+
+# One pass over a well-formed critique response: score, issues block,
+# and verdict in template order. Compiled once at import.
+_CRITIQUE_RE = re.compile(
+    r"OVERALL\s*SCORE[^\d]*(?P<score>\d+)"
+    r".*?CRITICAL\s*ISSUES[:\s]*(?P<issues>.*?)"
+    r"VERDICT[:\s]*\**\s*(?P<verdict>PASS|FAIL)",
+    re.DOTALL | re.IGNORECASE,
+)
+
+
+def parse_critique(text: str):
+    """
+    Parse a critique response that follows CRITIQUE_PROMPT_TEMPLATE's
+    section order in a single regex pass.
+
+    Returns {"overall_score", "passed", "issues"} or None when the
+    response doesn't match the expected structure (callers fall back to
+    looser heuristics).
+    """
+    match = _CRITIQUE_RE.search(text)
+    if match is None:
+        return None
+
+    issues = []
+    for line in match["issues"].splitlines():
+        stripped = line.lstrip()
+        if stripped and stripped[0] in "-•*":
+            item = stripped[1:].strip()
+            if item:
+                issues.append(item)
+
+    return {
+        "overall_score": int(match["score"]),
+        "passed": match["verdict"].upper() == "PASS",
+        "issues": issues,
+    }
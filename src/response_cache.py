@@ -0,0 +1,63 @@
+"""
+Local cache of generation responses keyed by (prompt, reference image).
+
+Version prompts are immutable for a given edit state and generations are
+the expensive step - when you iterate on downstream code (grid, critique
+parsing, output handling) without touching prompts or photos, replays come
+back from disk at zero API cost. Keys hash the full prompt content and the
+encoded reference, so editing STYLE_FOUNDATION, a version body, or the
+photo invalidates automatically.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import orjson
+
+
+class ResponseCache:
+    """SQLite-backed cache of generated images + response metadata."""
+
+    def __init__(self, db_path):
+        # One connection shared across the pipeline's worker threads,
+        # serialized by a lock - writes are rare (one per live generation)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, image BLOB, meta BLOB, created REAL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(prompt_content: str, reference_b64: str) -> str:
+        """Hash prompt content and encoded reference into a cache key."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(prompt_content.encode())
+        digest.update(b"\x1f")
+        digest.update(reference_b64.encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return {"image": bytes, "meta": dict} or None on miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT image, meta FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"image": row[0], "meta": orjson.loads(row[1])}
+
+    def put(self, key: str, image: bytes, meta: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, image, orjson.dumps(meta), time.time()),
+            )
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()